@@ -31,6 +31,7 @@ import datetime
 import os
 import re
 import requests
+from urllib3.util.retry import Retry
 try:
 	import gitlab
 	import gitlab.v4.objects
@@ -39,8 +40,17 @@ except ModuleNotFoundError as e:
 	raise e
 import concurrent.futures
 import csv
-from typing import List, Dict, Iterator, Union
+from collections import Counter, defaultdict
+from typing import List, Dict, AsyncIterator, Iterable, Iterator, Sequence, Union
 import math
+import functools
+import itertools
+import asyncio
+try:
+	import aiohttp
+except ModuleNotFoundError:
+	# Only needed for --async
+	aiohttp = None
 
 
 start_time = time.time()
@@ -51,6 +61,17 @@ def date_range(date1: datetime.date, date2: datetime.date) -> Iterator[datetime.
 		yield date1 + datetime.timedelta(n)
 
 
+@functools.lru_cache(maxsize=4096)
+def parse_date(s: str) -> datetime.date:
+	"""Return a date object from a string starting with YYYY-MM-DD, e.g. an ISO timestamp of the GitLab API."""
+	return datetime.date(int(s[0:4]), int(s[5:7]), int(s[8:10]))
+
+
+def parse_datetime(s: str) -> datetime.datetime:
+	"""Return a naive datetime object from an ISO timestamp like 2021-01-02T10:00:00.000Z, ignoring fractions."""
+	return datetime.datetime(int(s[0:4]), int(s[5:7]), int(s[8:10]), int(s[11:13]), int(s[14:16]), int(s[17:19]))
+
+
 def print_time_of_day(date: datetime.datetime) -> str:
 	"""Format a date.datetime object to be printed in the format 10:00."""
 	return "{:%H:%M}".format(date)
@@ -62,20 +83,28 @@ def round_up(f: float, d: int) -> float:
 
 	Example: round_up(1.654, 2) -> 1.66
 	"""
-	return math.ceil(f * 10**d) / 10**d
+	p = 10**d
+	# Round away float noise first, otherwise e.g. 1.1 * 100 = 110.00000000000001 is rounded up to 111
+	return math.ceil(round(f * p, 9)) / p
+
+
+_TEX_TRANS = str.maketrans({"\\": r"\\",
+                            "]": r"{\]}",
+                            "^": r"{\^}",
+                            "#": r"{\#}",
+                            "$": r"{\$}",
+                            "*": r"{\*}",
+                            ",": r".",
+                            "&": r"{\&}"})
 
 
 def translate_tex(s: str):
 	"""Translate special characters for Tex usage."""
-	return s.translate(str.maketrans({"\\": r"\\",
-	                                  "]": r"{\]}",
-	                                  "^": r"{\^}",
-	                                  "#": r"{\#}",
-	                                  "$": r"{\$}",
-	                                  "*": r"{\*}",
-	                                  ",": r".",
-	                                  "&": r"{\&}"}))
+	return s.translate(_TEX_TRANS)
+
 
+# Buffer size of the CSV files, large enough to write most timesheets at once
+CSV_BUFFER_SIZE = 1 << 20
 
 IssueOrMergeRequest = Union[gitlab.v4.objects.ProjectIssue, gitlab.v4.objects.ProjectMergeRequest]
 
@@ -109,29 +138,38 @@ class Note:
 		self.time_spents = [time_spent]
 		self.spend_date = spend_date
 		self.spend_datetimes = [spend_datetime]
+		# Precomputed tuples for __eq__/__hash__ and __lt__
+		self._key = (issue_mr.id, user["id"], spend_date)
+		self._sort_key = (project.id, issue_mr.iid, spend_date)
+		# Sum of time_spents and the formatted title, kept up to date by add()
+		self._total = time_spent
+		self._title = None
 
 	def time_spent(self) -> int:
-		return sum(self.time_spents)
+		return self._total
 
 	def title(self) -> str:
-		# issue_mr.id is the unique id over all issues/merge requests.
-		# Here, we need the iid which is project related.
-		return f"{self.project.name}{self.token}{self.issue_mr.iid} {self.issue_mr.title}: {self.time_spent()} min"
+		if self._title is None:
+			# issue_mr.id is the unique id over all issues/merge requests.
+			# Here, we need the iid which is project related.
+			self._title = f"{self.project.name}{self.token}{self.issue_mr.iid} " \
+			              f"{self.issue_mr.title}: {self.time_spent()} min"
+		return self._title
 
 	def __eq__(self, other: Note) -> bool:
 		"""Compare issue/merge request id (which is unique under all issues), user id and spend date."""
 		if isinstance(other, Note):
-			return self.issue_mr.id == other.issue_mr.id and \
-			       self.user["id"] == other.user["id"] and \
-			       self.spend_date == other.spend_date
+			return self._key == other._key
 		else:
 			raise NotImplementedError
 
+	def __hash__(self) -> int:
+		return hash(self._key)
+
 	def __lt__(self, other: Note) -> bool:
 		"""Order by project id, issue/merge request id and spend date lexicographically."""
 		if isinstance(other, Note):
-			return (self.project.id, self.issue_mr.iid, self.spend_date)\
-			       < (other.project.id, other.issue_mr.iid, other.spend_date)
+			return self._sort_key < other._sort_key
 		else:
 			raise NotImplementedError
 
@@ -142,6 +180,8 @@ class Note:
 		"""Merge two __eq__ time spents by adding new other time spent and spend time to the list."""
 		self.time_spents.extend(other.time_spents)
 		self.spend_datetimes.extend(other.spend_datetimes)
+		self._total += sum(other.time_spents)
+		self._title = None
 
 
 class IssueAndMrList:
@@ -151,12 +191,21 @@ class IssueAndMrList:
 	"""
 	def __init__(self):
 		self.notes = []
+		# Maps each note to the equal (see Note.__eq__) merged Note in self.notes
+		self._index = {}
+		# Lookup tables built by finalize() once all notes are collected
+		self._by_user_date = {}
+		self._sum_date_user = {}
+		self._users = {}
+		self._projects = {}
+		self._sum_user = Counter()
+		self._sum_project = Counter()
 
 	def projects(self) -> Dict[int, str]:
-		return {note.project.id: note.project.name for note in self.notes}
+		return self._projects
 
 	def users(self) -> Dict[int, str]:
-		return {note.user["id"]: note.user["username"] for note in self.notes}
+		return self._users
 
 	def __repr__(self) -> str:
 		return "\n".join(map(str, self.notes))
@@ -166,27 +215,48 @@ class IssueAndMrList:
 		If the note already exists in the list, add the new information to it,
 		otherwise, append the new note to the list.
 		"""
-		if note in self.notes:
-			i = self.notes.index(note)
-			self.notes[i].add(note)
+		if note in self._index:
+			self._index[note].add(note)
 		else:
+			self._index[note] = note
 			self.notes.append(note)
 
+	def bulk_update(self, notes: Iterable[Note]) -> None:
+		"""Update the list with several notes, see update."""
+		for note in notes:
+			self.update(note)
+
+	def finalize(self) -> None:
+		"""
+		Group the collected notes by date and user and sum them up by user and project in a single pass.
+
+		Must be called after all notes were added and before the timesheets are printed.
+		"""
+		by_user_date = defaultdict(lambda: defaultdict(list))
+		sum_date_user = defaultdict(int)
+		self._users = {}
+		self._projects = {}
+		self._sum_user = Counter()
+		self._sum_project = Counter()
+		for note in self.notes:
+			time_spent = note.time_spent()
+			key = (note.spend_date, note.user["id"])
+			by_user_date[note.user["id"]][note.spend_date].append(note)
+			sum_date_user[key] += time_spent
+			self._users[note.user["id"]] = note.user["username"]
+			self._projects[note.project.id] = note.project.name
+			self._sum_user[note.user["id"]] += time_spent
+			self._sum_project[note.project.id] += time_spent
+		self._by_user_date = {user_id: dict(by_date) for user_id, by_date in by_user_date.items()}
+		self._sum_date_user = dict(sum_date_user)
+
 	def sum_project(self, project_id: int) -> int:
 		"""Return sum of all time spents in a specific project."""
-		return sum(i.time_spent() for i in self.notes if project_id == i.project.id)
+		return self._sum_project[project_id]
 
 	def sum_user(self, user_id: int) -> int:
 		"""Return sum of all time spents for a specific user."""
-		return sum(i.time_spent() for i in self.notes if user_id == i.user["id"])
-
-	def get_date_user(self, date: datetime.date, user_id: int) -> Iterator[Note]:
-		"""Return Iterator over all notes of the same date and user."""
-		return filter(lambda i: date == i.spend_date and user_id == i.user["id"], self.notes)
-
-	def sum_date_user(self, date: datetime.date, user_id: int) -> int:
-		"""Return sum of all time spents of a specific date from a user."""
-		return sum(i.time_spent() for i in self.get_date_user(date, user_id))
+		return self._sum_user[user_id]
 
 	def add_break_time(self, worked_minutes: int, date: datetime.date, user_id: int) -> int:
 		"""
@@ -208,17 +278,13 @@ class IssueAndMrList:
 			logging.warning(f"User {self.users()[user_id]} worked more than 10 hours on {date}.")
 			return worked_minutes + 45
 
-	def get_user_row(self, date: datetime.date, user_id: int, extern_version: bool=False) -> List[str]:
-		"""Return a row for the time sheet in list format to be used by the csv writer."""
-		# TODO Algorithm could be faster if we sort the list
-		#      and do the creation of the whole timesheet in the class method
-		# Needed change:
-		#  - do not use Data.update, append new notes instead,
-		#  - sort afterwards,
-		#  - clean entries with time_spent == 0,
-		#  - process for csv
-		notes = list(self.get_date_user(date, user_id))
+	def get_user_row(self, date: datetime.date, user_id: int, notes: Sequence[Note],
+					 extern_version: bool=False) -> List[str]:
+		"""
+		Return a row for the time sheet in list format to be used by the csv writer.
 
+		:param notes: All notes of the user at date, see finalize
+		"""
 		if not notes:
 			# Return empty row where only the date is set.
 			# We need empty strings to avoid bugs in CSV/Tex.
@@ -250,6 +316,19 @@ class IssueAndMrList:
 		        print_time_of_day(end_time),
 		        f"{attended_minutes-worked_minutes}m" if extern_version else titles]
 
+	def _user_rows(self, user_id: int, extern_version: bool=False) -> Iterator[List[str]]:
+		"""Yield the rows of a user timesheet for each date, see get_user_row."""
+		by_date = self._by_user_date.get(user_id, {})
+		for date in args.dates:
+			yield self.get_user_row(date, user_id, by_date.get(date, ()), extern_version)
+
+	def _total_rows(self, user_ids: List[int]) -> Iterator[list]:
+		"""Yield the rows of the total timesheet for each date with the time spent of each user."""
+		# Bound once, the lookup runs for each date and user
+		get_sum = self._sum_date_user.get
+		for date in args.dates:
+			yield [date] + [get_sum((date, user_id), 0) for user_id in user_ids]
+
 	def print_csv_users(self, extern_version: bool=False) -> None:
 		"""
 		Print time spents of a user to a CSV file.
@@ -265,12 +344,11 @@ class IssueAndMrList:
 			time_spent = self.sum_user(user_id)
 			try:
 				with open("timesheet-" + username + ("-official" if extern_version else "")
-				          + ".csv", "w", newline="", encoding="utf8") as csvfile:
+				          + ".csv", "w", newline="", encoding="utf8", buffering=CSV_BUFFER_SIZE) as csvfile:
 					wr = csv.writer(csvfile, quoting=csv.QUOTE_MINIMAL)
 
 					wr.writerow(["Date", username, "Start", "End", ("Pause" if extern_version else "Issues")])
-					for date in date_range(args.start, args.end):
-						wr.writerow(self.get_user_row(date, user_id, extern_version))
+					wr.writerows(self._user_rows(user_id, extern_version))
 
 					wr.writerow(["Sum h:mm", f"{time_spent // 60}h{time_spent % 60:02}m"] + 3 *[""])
 					wr.writerow(["Sum h", round_up(time_spent / 60, 2)] + 3 * [""])
@@ -288,16 +366,18 @@ class IssueAndMrList:
 				Sum h
 		"""
 		try:
-			with open("total-timesheet.csv", "w", newline="", encoding="utf8") as csvfile:
+			with open("total-timesheet.csv", "w", newline="", encoding="utf8", buffering=CSV_BUFFER_SIZE) as csvfile:
 				wr = csv.writer(csvfile, quoting=csv.QUOTE_MINIMAL)
 
-				wr.writerow(["Date"] + [username for username in self.users().values()])
-				for date in date_range(args.start, args.end):
-					wr.writerow([date] + [str(self.sum_date_user(date, user_id)) for user_id in self.users()])
+				user_ids = list(self._users)
+				usernames = list(self._users.values())
 
-				time_spents = [self.sum_user(user_id) for user_id in issues_mrs.users()]
+				wr.writerow(["Date"] + usernames)
+				wr.writerows(self._total_rows(user_ids))
+
+				time_spents = [self.sum_user(user_id) for user_id in user_ids]
 				wr.writerow(["Sum h:mm"] + [f"{t // 60}h{t % 60:02}m" for t in time_spents])
-				wr.writerow(["Sum h"] + [str(round_up(t / 60, 2)) for t in self.users()])
+				wr.writerow(["Sum h"] + [str(round_up(t / 60, 2)) for t in time_spents])
 			logging.info(f"Printed total timesheet")
 		except OSError as e:
 			logging.warning(f"{str(e)} for total timesheet")
@@ -308,39 +388,39 @@ class IssueAndMrList:
 #######################################################################################################################
 
 
+# Map units of time to minutes.
+#
+# A time entry can have the following format:
+#   1mo 2w 3d 4h 5m 6s
+_TIME_T = {
+	"mo": 9600,  # 1 working month consists of 4 working weeks
+	"w": 2400,  # 1 working week consists of 5 working days
+	"d": 480,  # 1 working day consists of 8 hours
+	"h": 60,
+	"m": 1,
+	"s": 1 / 60,
+}
+
+# Compiled once, these are applied to every time spent note
+_DATE_RE = re.compile(r"(?<=at )\d{4}-\d{2}-\d{2}$")
+_KIND_RE = re.compile(r"^(added|subtracted) (.*) of time spent")
+# "mo" has to be tried before "m"
+_TOK_RE = re.compile(r"(\d+)(mo|w|d|h|m|s)")
+
+
 def extract_date(note: str) -> datetime.date:
 	"""Return a date object from a string of format 'at YYYY-MM-DD'."""
-	return datetime.date.fromisoformat(re.search(r"(?<=at )\d{4}-\d{2}-\d{2}$", note).group())
+	return datetime.date.fromisoformat(_DATE_RE.search(note).group())
 
 
 def extract_time_spent(note: str) -> int:
 	"""Return time spent in minutes from a gitlab time spent note."""
-	type, time_spent_str = re.search(r"^(added|subtracted) (.*) of time spent", note).groups()
+	type, time_spent_str = _KIND_RE.match(note).groups()
 	if type not in ["added", "subtracted"]:
 		msg = f"extract_time_spent: type {type}, time_spent_str {time_spent_str}, note {note}"
 		raise NotImplementedError(msg).with_traceback(sys.exc_info()[2])
 
-	# Map units of time to minutes.
-	#
-	# A time entry can have the following format:
-	#   1mo 2w 3d 4h 5m 6s
-	time_translations = {
-		"mo": 9600,  # 1 working month consists of 4 working weeks
-		"w": 2400,  # 1 working week consists of 5 working days
-		"d": 480,  # 1 working day consists of 8 hours
-		"h": 60,
-		"m": 1,
-		"s": 1 / 60,
-	}
-
-	time_spent = 0
-	time_spent_array = time_spent_str.split(" ")
-	for time_spent_part in time_spent_array:
-		# "mo" is the only two-character unit and requires different handling.
-		if time_spent_part[-2:] == "mo":
-			time_spent += int(time_spent_part[:-2]) * time_translations["mo"]
-		else:
-			time_spent += int(time_spent_part[:-1]) * time_translations[time_spent_part[-1:]]
+	time_spent = sum(int(value) * _TIME_T[unit] for value, unit in _TOK_RE.findall(time_spent_str))
 
 	# Negate calculated time spent if the keyword subtracted is used
 	if type == "subtracted":
@@ -349,47 +429,128 @@ def extract_time_spent(note: str) -> int:
 	return time_spent
 
 
-def process_issue_mr(issue_mr: IssueOrMergeRequest,
-					 gl: gitlab.Gitlab,
-					 issues_mrs: IssueAndMrList) -> None:
+def fetch_project_items(project: gitlab.v4.objects.Project) -> List[IssueOrMergeRequest]:
 	"""
-	Thread function to extract when (date) a user worked on which issue/project and save it to Data.
-
-	This function filters the issue and "decides" whether it will be added to the note list.
+	Thread function to list all issues and merge requests of a project created before the end date
+	and updated since the start date.
 	"""
+	# Issues and merge requests which were not updated since the start date can not contain new time spents
+	issues = project.issues.list(all=True, updated_after=args.start.isoformat())
+	mrs = project.mergerequests.list(all=True, updated_after=args.start.isoformat())
+
+	# updated_after already filters on the server, the check on updated_at guards against a date skew
+	return [issue_mr for issue_mr in issues + mrs
+	        if issue_mr.created_at[:10] < args.end_iso and args.start_iso <= issue_mr.updated_at[:10]]
+
+
+def _notes_url(api_url: str, project_id: int, issue_mr: IssueOrMergeRequest) -> str:
+	"""Return the REST API url of the notes of an issue or merge request."""
 	if isinstance(issue_mr, gitlab.v4.objects.ProjectIssue):
-		p_issue_mr = gl.projects.get(issue_mr.project_id, lazy=True).issues.get(issue_mr.iid)
+		kind = "issues"
 	elif isinstance(issue_mr, gitlab.v4.objects.ProjectMergeRequest):
-		p_issue_mr = gl.projects.get(issue_mr.project_id, lazy=True).mergerequests.get(issue_mr.iid)
+		kind = "merge_requests"
 	else:
 		raise NotImplementedError
 
-	if datetime.date.fromisoformat(p_issue_mr.updated_at[:10]) < args.start:
-		return
+	return f"{api_url}/projects/{project_id}/{kind}/{issue_mr.iid}/notes"
+
+
+# Query parameters of the first notes page, the next links already contain them
+NOTES_PARAMS = {"per_page": 100, "order_by": "created_at", "sort": "desc"}
+
+# Retry policy of the HTTP requests, used by the adapter in _connect_gitlab and by _fetch_notes_async
+RETRY_STATUSES = (429, 502, 503, 504)
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 0.3
+
+
+def _retry_delay(status: int, headers, attempt: int) -> Union[float, None]:
+	"""
+	Return the seconds to wait before retrying a request which failed with status, or None to give up.
+
+	The Retry-After header is honored, otherwise the delay grows exponentially with attempt (starting at 0).
+	Only needed for aiohttp, requests sessions retry by their adapter.
+	"""
+	if status not in RETRY_STATUSES or attempt >= RETRY_TOTAL:
+		return None
+	try:
+		return float(headers["Retry-After"])
+	except (KeyError, ValueError):
+		return RETRY_BACKOFF_FACTOR * 2**attempt
 
-	notes = p_issue_mr.notes.list(all=True)
+
+def _fetch_notes(session: requests.Session, url: str, token: str) -> Iterator[List[dict]]:
+	"""
+	Yield the notes of an issue or merge request page by page as raw JSON dicts, newest first.
+
+	The notes endpoint is queried directly to avoid creating a python-gitlab object for every note.
+	Pages are requested lazily by following the Link header, so breaking the iteration skips the remaining pages.
+	Rate limited and transient errors are retried by the adapter of the session, see _connect_gitlab.
+	"""
+	params = NOTES_PARAMS
+	headers = {"PRIVATE-TOKEN": token}
+	while url:
+		response = session.get(url, params=params, headers=headers)
+		response.raise_for_status()
+		yield response.json()
+		url = response.links.get("next", {}).get("url")
+		params = None
+
+
+async def _fetch_notes_async(session: aiohttp.ClientSession, url: str) -> AsyncIterator[List[dict]]:
+	"""
+	Asynchronous version of _fetch_notes, the token is set in the headers of the session.
+
+	Uses the retry policy of the adapter in _connect_gitlab, so a rate limited page does not abort all other
+	requests of the event loop.
+	"""
+	params = NOTES_PARAMS
+	while url:
+		for attempt in itertools.count():
+			async with session.get(url, params=params) as response:
+				delay = _retry_delay(response.status, response.headers, attempt)
+				if delay is None:
+					response.raise_for_status()
+					notes = await response.json()
+					next_link = response.links.get("next")
+					break
+			logging.debug(f"Got status {response.status} for {url}, retrying in {delay} seconds")
+			await asyncio.sleep(delay)
+		yield notes
+		url = str(next_link["url"]) if next_link else None
+		params = None
+
+
+def collect_time_spents(project: gitlab.v4.objects.Project, issue_mr: IssueOrMergeRequest,
+						notes: Iterable[dict], found_notes: List[Note]) -> bool:
+	"""
+	Append a Note to found_notes for each time spent in notes which lies in the time range.
+
+	:param notes: JSON dicts of GitLab notes ordered by creation date, newest first
+	:return: False if a time spent created before the start date was found, as all following notes are older
+	"""
 	for note in notes:
-		if note.system and "time spent" in note.body:
-			created_at = datetime.datetime.fromisoformat(note.created_at.split('.', 1)[0])
+		if note["system"] and "time spent" in note["body"]:
+			created_at = parse_datetime(note["created_at"])
 
 			# Issues are orderd by recency. A time spent can not be made for the future.
 			if created_at.date() < args.start:
-				break
+				return False
 
-			user = note.author["username"]
+			user = note["author"]["username"]
 
 			if args.users_blacklist and args.user and user in args.users:
 				continue
 			if args.users and user not in args.users:
 				continue
 
-			time_spent = extract_time_spent(note.body)
+			time_spent = extract_time_spent(note["body"])
 
 			# Older time spents have no date, use the creation date in that case
 			try:
-				spend_date = extract_date(note.body)
+				spend_date = extract_date(note["body"])
 			except AttributeError:
-				spend_date = datetime.date.fromisoformat(note.created_at[:10])
+				spend_date = parse_date(note["created_at"][:10])
 
 			# Do not add spend_date outside of the time range.
 			# It is not possible to quit the iteration early although the notes are ordered by creation_date, because:
@@ -404,7 +565,60 @@ def process_issue_mr(issue_mr: IssueOrMergeRequest,
 			# The spend time is not meaningful if it was not added on the same day.
 			spend_datetime = created_at if created_at.date() == spend_date else None
 
-			issues_mrs.update(Note(project, issue_mr, note.author, time_spent, spend_date, spend_datetime))
+			found_notes.append(Note(project, issue_mr, note["author"], time_spent, spend_date, spend_datetime))
+
+	return True
+
+
+def process_issue_mr(project: gitlab.v4.objects.Project,
+					 issue_mr: IssueOrMergeRequest,
+					 gl: gitlab.Gitlab) -> List[Note]:
+	"""
+	Thread function to extract when (date) a user worked on which issue/project.
+
+	This function filters the issue and "decides" which notes will be returned.
+	The notes are merged into the IssueAndMrList by the main thread, so no locking is needed.
+	"""
+	found_notes = []
+
+	url = _notes_url(gl.api_url, project.id, issue_mr)
+	for notes in _fetch_notes(gl.session, url, gl.private_token):
+		if not collect_time_spents(project, issue_mr, notes, found_notes):
+			break
+
+	return found_notes
+
+
+async def process_issue_mr_async(project: gitlab.v4.objects.Project,
+								 issue_mr: IssueOrMergeRequest,
+								 api_url: str,
+								 session: aiohttp.ClientSession,
+								 semaphore: asyncio.Semaphore) -> List[Note]:
+	"""Coroutine version of process_issue_mr, at most semaphore issues/merge requests are fetched at once."""
+	found_notes = []
+
+	url = _notes_url(api_url, project.id, issue_mr)
+	async with semaphore:
+		async for notes in _fetch_notes_async(session, url):
+			if not collect_time_spents(project, issue_mr, notes, found_notes):
+				break
+
+	return found_notes
+
+
+async def process_issues_mrs_async(project_issues_mrs: List[tuple], gl: gitlab.Gitlab,
+								   limit: int) -> List[List[Note]]:
+	"""
+	Fetch the notes of all (project, issue_mr) pairs concurrently in one event loop.
+
+	:param limit: Maximal number of simultaneous HTTP requests
+	:return: List of found notes for each pair in the same order
+	"""
+	connector = aiohttp.TCPConnector(limit=limit)
+	semaphore = asyncio.Semaphore(limit)
+	async with aiohttp.ClientSession(connector=connector, headers={"PRIVATE-TOKEN": gl.private_token}) as session:
+		return await asyncio.gather(*(process_issue_mr_async(project, issue_mr, gl.api_url, session, semaphore)
+		                              for project, issue_mr in project_issues_mrs))
 
 
 #######################################################################################################################
@@ -442,6 +656,8 @@ def parse_args() -> argparse.Namespace:
 	                        help="gather GitLab API access token from os.environ[*] (fallback if -t is not set)")
 	arg_parser.add_argument("--threads", default=10, type=int,
 	                        help="amount of simultaneous threads for the HTTP requests")
+	arg_parser.add_argument("--async", dest="async_mode", action="store_true",
+	                        help="fetch the notes asynchronously with aiohttp, using 4 connections per thread")
 	arg_parser.add_argument("-s", "--start", metavar="YYYY-MM-DD", default=first_this_month,
 	                        help="only include time spents from this day on", type=datetime.date.fromisoformat)
 	arg_parser.add_argument("-e", "--end", metavar="YYYY-MM-DD", default=today,
@@ -472,6 +688,9 @@ def parse_args() -> argparse.Namespace:
 
 	args = arg_parser.parse_args()
 
+	if args.async_mode and aiohttp is None:
+		arg_parser.error("--async requires aiohttp, install it with: pip install aiohttp")
+
 	if args.last_month:
 		args.end = first_this_month - datetime.timedelta(days=1)
 		args.start = args.end.replace(day=1)
@@ -480,6 +699,12 @@ def parse_args() -> argparse.Namespace:
 		msg = f"Start date ({args.start}) is after end date ({args.end})."
 		raise argparse.ArgumentTypeError(msg)
 
+	# All dates of the timespan, reused for every timesheet
+	args.dates = list(date_range(args.start, args.end))
+	# ISO dates are ordered lexicographically and can be compared to the date prefix of GitLab timestamps
+	args.start_iso = args.start.isoformat()
+	args.end_iso = args.end.isoformat()
+
 	return args
 
 
@@ -545,7 +770,12 @@ def _connect_gitlab(url: str, private_token: str, threads: int) -> gitlab.Gitlab
 	session = None
 	if threads:
 		session = requests.Session()
-		adapter = requests.adapters.HTTPAdapter(pool_connections=threads, pool_maxsize=threads)
+		# Both thread pools share the session, so the pool has to be larger than the number of threads.
+		# Rate limited (429) and transient errors are retried, honoring the Retry-After header of GitLab.
+		retry = Retry(total=RETRY_TOTAL, backoff_factor=RETRY_BACKOFF_FACTOR, status_forcelist=RETRY_STATUSES,
+		              raise_on_status=False)
+		adapter = requests.adapters.HTTPAdapter(pool_connections=max(threads, 32), pool_maxsize=max(threads * 4, 64),
+		                                        max_retries=retry)
 		session.mount('http://', adapter)
 		session.mount('https://', adapter)
 
@@ -639,34 +869,47 @@ if __name__ == '__main__':
 		logging.info(f"Listing all accessible gitlab projects in {args.url}")
 		projects = gl.projects.list(all=True, lazy=True)
 
+	active_projects = []
 	for project in projects:
-		if datetime.date.fromisoformat(project.last_activity_at[:10]) < args.start:
+		if project.last_activity_at[:10] < args.start_iso:
 			continue
 		if args.projects_blacklist and args.projects and project.id in args.projects:
 			continue
 		if args.projects and project.id not in args.projects:
 			continue
-
+		active_projects.append(project)
+
+	if args.async_mode:
+		# List issues and merge requests in threads and fetch all notes in a single event loop
+		with concurrent.futures.ThreadPoolExecutor(args.threads) as project_executor:
+			project_issues_mrs = [(project, issue_mr)
+			                      for project, items in zip(active_projects,
+			                                                project_executor.map(fetch_project_items, active_projects))
+			                      for issue_mr in items]
+
+		for found_notes in asyncio.run(process_issues_mrs_async(project_issues_mrs, gl, 4 * args.threads)):
+			issues_mrs.bulk_update(found_notes)
+	else:
 		# Parallel process each issue in a single thread
-		# The resulting data is saved in new_data and available by all threads
-		executor = concurrent.futures.ThreadPoolExecutor(args.threads)
-
-		issues = project.issues.list(all=True)
-		mrs = project.mergerequests.list(all=True)
-
-		issue_futures = [executor.submit(process_issue_mr, issue, gl, issues_mrs)
-		                 for issue in issues if datetime.date.fromisoformat(issue.created_at[:10]) < args.end]
-		mr_futures = [executor.submit(process_issue_mr, mr, gl, issues_mrs)
-		              for mr in mrs if datetime.date.fromisoformat(mr.created_at[:10]) < args.end]
-
-		all_futures = issue_futures + mr_futures
-		concurrent.futures.wait(all_futures)
-		for future in all_futures:
-			future.result()  # So that exceptions are properly raised.
+		# The resulting notes are merged into issues_mrs by the main thread
+		with concurrent.futures.ThreadPoolExecutor(args.threads) as executor, \
+		     concurrent.futures.ThreadPoolExecutor(args.threads) as project_executor:
+			# Issues and merge requests of all projects are listed concurrently as well
+			all_futures = []
+			for project, project_issues_mrs in zip(active_projects,
+			                                       project_executor.map(fetch_project_items, active_projects)):
+				all_futures += [executor.submit(process_issue_mr, project, issue_mr, gl)
+				                for issue_mr in project_issues_mrs]
+
+			concurrent.futures.wait(all_futures)
+			for future in all_futures:
+				# Merging in submission order keeps the output independent of thread timing
+				issues_mrs.bulk_update(future.result())  # So that exceptions are properly raised.
 
 	logging.info(f"HTTP requests finished after {time.time() - start_time_http_request} seconds\n")
 	start_time_printing = time.time()
 
+	issues_mrs.finalize()
 
 	issues_mrs.print_csv_users()
 